@@ -74,57 +74,110 @@ else
   check_cmd curl
 fi
 
-function fetch() {
-  local url="$1"
-  local dest_dir="$2"
-
-  local dest
-  dest="${dest_dir}/$(basename "${url}")"
+# Only a --mirror, which may be a local stand-in for GitHub releases, may be fetched from over plain http.
+CURL_PROTO="=https"
 
+function fetch() {
+  # Usage: fetch <url> <dest> [<url> <dest> ...]
+  #
+  # Fetches each url to its dest. With curl, all the fetches share one connection per host and a partial dest left by
+  # an interrupted fetch is resumed.
   if [[ "${OS}" == "windows" ]]; then
-    pwsh -c "Invoke-WebRequest -OutFile $dest -Uri $url"
+    while (($# > 0)); do
+      pwsh -c "Invoke-WebRequest -OutFile $2 -Uri $1"
+      shift 2
+    done
   else
-    curl --proto '=https' --tlsv1.2 -sSfL -o "${dest}" "${url}"
+    local args=()
+    local dests=()
+    while (($# > 0)); do
+      args+=(-o "$2" "$1")
+      dests+=("$2")
+      shift 2
+    done
+    local curl=(curl --proto "${CURL_PROTO}" --tlsv1.2 -sSfL)
+    if ! "${curl[@]}" -C - "${args[@]}" 2> /dev/null; then
+      # The server may not support resuming; so start over from scratch.
+      rm -f "${dests[@]}"
+      "${curl[@]}" "${args[@]}"
+    fi
   fi
 }
 
-if [[ "${OS}" == "macos" ]]; then
-  check_cmd shasum
+# Prefer whichever native SHA256 tool is installed: coreutils' sha256sum is usually present on Linux and Perl's shasum
+# on macOS, but either may be found on both.
+if command -v sha256sum > /dev/null; then
+  SHA256_CMD=(sha256sum)
 else
-  check_cmd sha256sum
+  check_cmd shasum
+  SHA256_CMD=(shasum --algorithm 256)
 fi
 
 function sha256() {
-  if [[ "${OS}" == "macos" ]]; then
-    shasum --algorithm 256 "$@"
-  else
-    sha256sum "$@"
-  fi
+  local digest
+  digest="$("${SHA256_CMD[@]}" < "$1")"
+  echo "${digest%% *}"
 }
 
 check_cmd mktemp
 
+# Downloaded binaries are kept in the cache dir by fingerprint, as `<cache dir>/<sha256>/<name>`, so that installing
+# a binary that was downloaded before does not download it again. An interrupted download is left in the cache dir as
+# `<url>.part` (with the url made safe for a file name) for the next attempt to resume.
 function install_from_url() {
   local url="$1"
   local dest="$2"
+  local cache_dir="$3"
 
+  local name
+  name="$(basename "${url}")"
   local workdir
   workdir="$(mktemp -d)"
   gc "${workdir}"
+  mkdir -p "${cache_dir}"
+  local partial="${cache_dir}/${url//[^[:alnum:]._-]/_}.part"
+
+  local binary_fetched="false"
+  if [[ -f "${dest}" ]] || compgen -G "${cache_dir}/*/${name}" > /dev/null; then
+    # We may already have the binary; so we fetch just its fingerprint to check.
+    fetch "${url}.sha256" "${workdir}/${name}.sha256"
+  else
+    fetch "${url}.sha256" "${workdir}/${name}.sha256" "${url}" "${partial}"
+    binary_fetched="true"
+  fi
+  local expected_sha256
+  read -r expected_sha256 _ < "${workdir}/${name}.sha256"
+  [[ "${expected_sha256}" =~ ^[0-9a-f]{64}$ ]] || die "The fingerprint at ${url}.sha256 is not a SHA256 hash."
+
+  if [[ -x "${dest}" && "$(sha256 "${dest}")" == "${expected_sha256}" ]]; then
+    green "${dest} already matches the fingerprint at ${url}.sha256; leaving it as is."
+    return 0
+  fi
+
+  local cached="${cache_dir}/${expected_sha256}/${name}"
+  if [[ -f "${cached}" && "$(sha256 "${cached}")" == "${expected_sha256}" ]]; then
+    log "Using ${cached}, downloaded previously."
+  else
+    if [[ "${binary_fetched}" == "false" ]] &&
+      ! [[ -f "${partial}" && "$(sha256 "${partial}")" == "${expected_sha256}" ]]; then
+      fetch "${url}" "${partial}"
+    fi
+    if [[ "$(sha256 "${partial}")" != "${expected_sha256}" ]]; then
+      # A partial download from a different binary can't be resumed; so we try once more from scratch.
+      rm -f "${partial}"
+      fetch "${url}" "${partial}"
+      [[ "$(sha256 "${partial}")" == "${expected_sha256}" ]] ||
+        die "Download from ${url} did not match the fingerprint at ${url}.sha256"
+    fi
+    mkdir -p "${cached%/*}"
+    mv -f "${partial}" "${cached}"
+  fi
 
-  fetch "${url}.sha256" "${workdir}"
-  fetch "${url}" "${workdir}"
-  (
-    cd "${workdir}"
-    sha256 -c --status ./*.sha256 ||
-      die "Download from ${url} did not match the fingerprint at ${url}.sha256"
-  )
-  rm "${workdir}/"*.sha256
   if [[ "${OS}" == "macos" ]]; then
     mkdir -p "$(dirname "${dest}")"
-    install -m 755 "${workdir}/"* "${dest}"
+    install -m 755 "${cached}" "${dest}"
   else
-    install -D -m 755 "${workdir}/"* "${dest}"
+    install -D -m 755 "${cached}" "${dest}"
   fi
 }
 
@@ -141,11 +194,23 @@ function calculate_arch() {
   fi
 }
 
+function install_target() {
+  # Installs one launcher in the background for a multi-target invocation, logging to the given file.
+  local url="$1"
+  local dest="$2"
+  local log_file="$3"
+
+  # N.B.: Subshells do not inherit the EXIT trap but do inherit what the parent has to clean up, which must outlive us.
+  _GC=()
+  trap gc EXIT
+  install_from_url "${url}" "${dest}" "${cache_dir}" > "${log_file}" 2>&1
+}
+
 check_cmd cat
 
 function usage() {
   cat << EOF
-Usage: $0
+Usage: $0 [options]
 
 Installs the pants launcher binary.
 
@@ -165,20 +230,53 @@ Once installed, if you want to update your "pants" launcher binary, use
 -d | --bin-dir:
   The directory to install the scie-pants binary in, "~/.local/bin" by default.
 
+-o | --output:
+  Where to install the scie-pants binary, "<bin dir>/<base name>" by default.
+  The placeholders {os}, {arch} and {version} are replaced for each target
+  installed; so when installing more than one target, use them to install
+  each to its own path. For example: "launchers/{version}/pants-{os}-{arch}".
+
 -b | --base-name:
   The name to use for the scie-pants binary, "pants" by default.
 
+-c | --cache-dir:
+  The directory to cache downloaded scie-pants binaries in, so that they need
+  not be downloaded again, "~/.cache/pants/get-pants" by default (respecting
+  XDG_CACHE_HOME). It is safe to delete.
+
 -V | --version:
   The version of the scie-pants binary to install, the latest version by default.
   The available versions can be seen at:
     https://github.com/pantsbuild/scie-pants/releases
+  May be repeated to install several versions.
+
+--os:
+  The operating system to install the scie-pants binary for: linux, macos or
+  windows; that of this machine by default. May be repeated.
+
+--arch:
+  The chip architecture to install the scie-pants binary for: x86_64 or
+  aarch64; that of this machine by default. May be repeated.
+
+--mirror:
+  The base URL to download scie-pants releases from, instead of
+  "https://github.com/pantsbuild/scie-pants/releases". Releases are expected
+  at the same paths under it. May be a plain http URL.
+
+When installing more than one target (each combination of --version, --os and
+--arch), all are downloaded and verified concurrently.
 
 EOF
 }
 
 bin_dir="${HOME}/.local/bin"
 base_name="pants"
-version="latest/download"
+cache_dir="${XDG_CACHE_HOME:-${HOME}/.cache}/pants/get-pants"
+output=""
+mirror="https://github.com/pantsbuild/scie-pants/releases"
+versions=()
+oses=()
+arches=()
 while (($# > 0)); do
   case "$1" in
     --help | -h)
@@ -193,8 +291,31 @@ while (($# > 0)); do
       base_name="$2"
       shift
       ;;
+    --cache-dir | -c)
+      cache_dir="$2"
+      shift
+      ;;
+    --output | -o)
+      output="$2"
+      shift
+      ;;
     --version | -V)
-      version="download/v$2"
+      versions+=("$2")
+      shift
+      ;;
+    --os)
+      [[ "$2" =~ ^(linux|macos|windows)$ ]] || die "Unsupported --os $2, expected one of linux, macos or windows."
+      oses+=("$2")
+      shift
+      ;;
+    --arch)
+      [[ "$2" =~ ^(x86_64|aarch64)$ ]] || die "Unsupported --arch $2, expected one of x86_64 or aarch64."
+      arches+=("$2")
+      shift
+      ;;
+    --mirror)
+      mirror="${2%/}"
+      CURL_PROTO="=http,https"
       shift
       ;;
     *)
@@ -205,16 +326,61 @@ while (($# > 0)); do
   shift
 done
 
-ARCH="$(calculate_arch)"
-URL="https://github.com/pantsbuild/scie-pants/releases/${version}/scie-pants-${OS}-${ARCH}"
-dest="${bin_dir}/${base_name}"
+((${#versions[@]} > 0)) || versions=("latest")
+((${#oses[@]} > 0)) || oses=("${OS}")
+((${#arches[@]} > 0)) || arches=("$(calculate_arch)")
+output="${output:-${bin_dir}/${base_name}}"
+
+urls=()
+dests=()
+for version in "${versions[@]}"; do
+  for os in "${oses[@]}"; do
+    for arch in "${arches[@]}"; do
+      if [[ "${version}" == "latest" ]]; then
+        urls+=("${mirror}/latest/download/scie-pants-${os}-${arch}")
+      else
+        urls+=("${mirror}/download/v${version}/scie-pants-${os}-${arch}")
+      fi
+      dest="${output//\{version\}/${version}}"
+      dest="${dest//\{os\}/${os}}"
+      dest="${dest//\{arch\}/${arch}}"
+      for other in ${dests[@]+"${dests[@]}"}; do
+        [[ "${other}" != "${dest}" ]] ||
+          die "More than one target would be installed to ${dest}; use --output with placeholders to tell them apart."
+      done
+      dests+=("${dest}")
+    done
+  done
+done
 
-log "Downloading and installing the pants launcher ..."
-install_from_url "${URL}" "${dest}"
-green "Installed the pants launcher from ${URL} to ${dest}"
-if ! command -v "${base_name}" > /dev/null; then
-  warn "${dest} is not on the PATH."
-  log "You'll either need to invoke ${dest} explicitly or else add ${bin_dir} to your shell's PATH."
+if ((${#urls[@]} == 1)); then
+  log "Downloading and installing the pants launcher ..."
+  install_from_url "${urls[0]}" "${dests[0]}" "${cache_dir}"
+  green "Installed the pants launcher from ${urls[0]} to ${dests[0]}"
+  if [[ "${dests[0]}" == "${bin_dir}/${base_name}" ]] && ! command -v "${base_name}" > /dev/null; then
+    warn "${dests[0]} is not on the PATH."
+    log "You'll either need to invoke ${dests[0]} explicitly or else add ${bin_dir} to your shell's PATH."
+  fi
+else
+  log "Downloading and installing ${#urls[@]} pants launchers ..."
+  logs_dir="$(mktemp -d)"
+  gc "${logs_dir}"
+  pids=()
+  for i in "${!urls[@]}"; do
+    install_target "${urls[$i]}" "${dests[$i]}" "${logs_dir}/${i}.log" &
+    pids+=("$!")
+  done
+  failures=0
+  for i in "${!urls[@]}"; do
+    if wait "${pids[$i]}"; then
+      green "Installed the pants launcher from ${urls[$i]} to ${dests[$i]}"
+    else
+      failures=$((failures + 1))
+      warn "Failed to install the pants launcher from ${urls[$i]} to ${dests[$i]}:"
+      cat "${logs_dir}/${i}.log" 1>&2
+    fi
+  done
+  ((failures == 0)) || die "Failed to install ${failures} of ${#urls[@]} pants launchers."
 fi
 
 green "\nRunning \`pants\` in a Pants-enabled repo will use the version of Pants configured for that repo."
@@ -26,19 +26,59 @@ if [ -f "pants" ]; then
   fail
 fi
 
+PYPI_URL="${PYPI_URL:-https://pypi.org}"
+PANTS_SCRIPT_URL="${PANTS_SCRIPT_URL:-https://static.pantsbuild.org/setup/pants}"
+PANTS_SETUP_CACHE="${PANTS_SETUP_CACHE:-${XDG_CACHE_HOME:-$HOME/.cache}/pants/setup}"
+# The latest stable version found on PyPI is re-used for an hour, recorded with the PyPI URL it came from so that
+# switching mirrors does not pick up another index's version.
+LATEST_VERSION_CACHE="${PANTS_SETUP_CACHE}/latest-pants-version"
+
+# Fetch the Pants bootstrap script while we look up the version.
+curl -sSfL -o pants "$PANTS_SCRIPT_URL" &
+PANTS_SCRIPT_FETCH=$!
+
+function latest_pants_version {
+  # The project's JSON document on PyPI runs to megabytes, but the latest stable version is given in its leading
+  # "info" section. So we stream the document and stop reading it as soon as we see the version.
+  local cached_url cached_version version
+  if [ -n "$(find "$LATEST_VERSION_CACHE" -mmin -60 2> /dev/null)" ] &&
+    { read -r cached_url && read -r cached_version; } < "$LATEST_VERSION_CACHE" &&
+    [ "$cached_url" = "$PYPI_URL" ] && [ -n "$cached_version" ]; then
+    echo "$cached_version"
+    return 0
+  fi
+  version=$(curl -sSfL "$PYPI_URL/pypi/pantsbuild.pants/json" 2> /dev/null |
+    tr ',' '\n' |
+    grep -m1 -o '"version": *"[^"]*"' |
+    grep -o "[0-9]*\.[0-9]*\.[0-9]*")
+  if [ -z "$version" ]; then
+    return 1
+  fi
+  (mkdir -p "$PANTS_SETUP_CACHE" && printf '%s\n%s\n' "$PYPI_URL" "$version" > "$LATEST_VERSION_CACHE") 2> /dev/null || true
+  echo "$version"
+}
+
 # Find the latest stable version from PyPI if not set at the command line.
 if [ -z "$PANTS_VERSION" ]; then
-  PANTS_VERSION=$(curl https://pypi.org/pypi/pantsbuild.pants/json |
-    grep -o '"version":"[^"]*"' |
-    grep -o "[0-9]*\.[0-9]*\.[0-9]*")
+  if ! PANTS_VERSION=$(latest_pants_version); then
+    echo Could not find the latest version of Pants at "$PYPI_URL". > /dev/stderr
+    kill "$PANTS_SCRIPT_FETCH" 2> /dev/null || true
+    wait "$PANTS_SCRIPT_FETCH" || true
+    rm -f pants
+    fail
+  fi
+fi
+
+if ! wait "$PANTS_SCRIPT_FETCH"; then
+  echo Could not download the Pants bootstrap script from "$PANTS_SCRIPT_URL". > /dev/stderr
+  rm -f pants
+  fail
 fi
 
 # Create enough of a pants.toml file that our bootstrap process can run
 printf '[GLOBAL]\npants_version = "%s"\n' "$PANTS_VERSION" > pants.toml
 
-# Fetch the Pants bootstrap script and run it to verify that we fetched
-# the correct version
-curl -L -O https://static.pantsbuild.org/setup/pants
+# Run the Pants bootstrap script to verify that we fetched the correct version
 chmod +x ./pants
 PANTS_EXEC_VERSION=$(./pants --version)
 
@@ -1,11 +1,14 @@
 # Copyright 2019 Pants project contributors (see CONTRIBUTORS.md).
 # Licensed under the Apache License, Version 2.0 (see LICENSE).
 
+import os
 import shutil
+import subprocess
 from pathlib import Path
-from typing import Optional
+from typing import Any, Iterator, List, Optional
 
 import pytest
+from helpers import ArtifactServer, SeedCache, serve_recordings
 from typing_extensions import Protocol
 
 
@@ -28,3 +31,78 @@ def build_root(tmp_path: Path, monkeypatch: MonkeyPatch) -> Path:
     build_root.mkdir()
     shutil.copy("./pants", str(build_root / "pants"))
     return build_root
+
+
+@pytest.fixture
+def python() -> str:
+    """A Python that ./pants can bootstrap any recent Pants with."""
+    for name in ("python3.9", "python3.8", "python3.7"):
+        exe = shutil.which(name)
+        if exe and subprocess.run([exe, "--version"], capture_output=True).returncode == 0:
+            return exe
+    raise AssertionError("Testing requires one of Python 3.7, 3.8 or 3.9 available on the $PATH.")
+
+
+@pytest.fixture(scope="session")
+def seed_cache(tmp_path_factory: Any) -> SeedCache:
+    """A `PANTS_SETUP_CACHE` tests can clone Pants venvs from rather than bootstrapping them anew.
+
+    Tests that exercise bootstrapping Pants for the first time should not use this.
+    """
+    base_temp = tmp_path_factory.getbasetemp()
+    # N.B.: Under pytest-xdist each worker has its own base temp dir, all under a shared parent.
+    if "PYTEST_XDIST_WORKER" in os.environ:
+        base_temp = base_temp.parent
+    return SeedCache(base_temp / "seed_cache")
+
+
+@pytest.fixture(scope="session")
+def artifact_server() -> Iterator[Optional[ArtifactServer]]:
+    """Serve the artifacts the scripts download from recordings, if PANTS_TEST_RECORDINGS is set.
+
+    Any test that asks for an artifact not yet recorded fails, rather than falling through to the
+    network. Run the suite with PANTS_TEST_RECORD set as well to record what is missing. Set
+    PANTS_TEST_LATENCY (seconds per request) and PANTS_TEST_BANDWIDTH (bytes per second) to
+    benchmark downloads on slow links.
+    """
+    recordings = os.environ.get("PANTS_TEST_RECORDINGS")
+    if not recordings:
+        yield None
+        return
+    bandwidth = os.environ.get("PANTS_TEST_BANDWIDTH")
+    missing: List[str] = []
+    with serve_recordings(
+        Path(recordings),
+        record=bool(os.environ.get("PANTS_TEST_RECORD")),
+        missing=missing,
+        latency=float(os.environ.get("PANTS_TEST_LATENCY", "0")),
+        bytes_per_second=int(bandwidth) if bandwidth else None,
+    ) as url:
+        yield ArtifactServer(url=url, missing=missing)
+
+
+@pytest.fixture(autouse=True)
+def hermetic_urls(
+    artifact_server: Optional[ArtifactServer], monkeypatch: MonkeyPatch
+) -> Iterator[None]:
+    """Point the scripts under test at the artifact server, when there is one."""
+    if artifact_server is None:
+        yield
+        return
+    url = artifact_server.url
+    monkeypatch.setenv("PANTS_GITHUB_URL", f"{url}/github.com")
+    monkeypatch.setenv("PANTS_GITHUB_RAW_URL", f"{url}/raw.githubusercontent.com")
+    monkeypatch.setenv("PANTS_BINARIES_URL", f"{url}/binaries.pantsbuild.org")
+    monkeypatch.setenv("PIP_INDEX_URL", f"{url}/pypi.org/simple/")
+    monkeypatch.setenv("PYPI_URL", f"{url}/pypi.org")
+    monkeypatch.setenv("PANTS_SCRIPT_URL", f"{url}/static.pantsbuild.org/setup/pants")
+    monkeypatch.setenv("SCIE_PANTS_MIRROR", f"{url}/github.com/pantsbuild/scie-pants/releases")
+    del artifact_server.missing[:]
+    yield
+    if artifact_server.missing:
+        missing = sorted(set(artifact_server.missing))
+        del artifact_server.missing[:]
+        pytest.fail(
+            "There are no recordings of these artifacts; re-run with PANTS_TEST_RECORD=1 to record "
+            "them:\n" + "\n".join(missing)
+        )
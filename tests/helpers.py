@@ -1,8 +1,22 @@
 # Copyright 2019 Pants project contributors (see CONTRIBUTORS.md).
 # Licensed under the Apache License, Version 2.0 (see LICENSE).
 
+import functools
+import http.server
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
 from textwrap import dedent
+from typing import Any, Hashable, Iterator, List, Mapping, Optional, Set, Tuple
 
 
 def create_pants_config(
@@ -24,3 +38,304 @@ def create_pants_config(
             """
         )
     )
+
+
+def bootstrap_dir(setup_cache: Path) -> Path:
+    uname = os.uname()
+    return setup_cache / f"bootstrap-{uname.sysname}-{uname.machine}"
+
+
+def create_fake_pants_venv(
+    *, setup_cache: Path, pants_version: str, python: str, manifest: bool = False
+) -> Path:
+    """Create a stand-in for a bootstrapped Pants venv, laid out as `./pants` lays out a real one.
+
+    The fake `pants` only reports the `--pants-version` it was launched with, which lets us exercise
+    the launcher without the cost (and network access) of bootstrapping a real Pants. With
+    `manifest`, the venv carries the manifest `./pants` writes for a venv it built itself;
+    otherwise it is like a venv bootstrapped before manifests existed.
+    """
+    probe = "import os, sys; print(*sys.version_info[:2], os.path.realpath(sys.executable))"
+    major, minor, python_realpath = subprocess.run(
+        [python, "-c", probe],
+        check=True,
+        stdout=subprocess.PIPE,
+        encoding="utf-8",
+    ).stdout.split()
+
+    bootstrap = bootstrap_dir(setup_cache)
+    bootstrap.mkdir(parents=True, exist_ok=True)
+    install = Path(tempfile.mkdtemp(prefix="pants.", dir=str(bootstrap))) / "install"
+    subprocess.run([python, "-m", "venv", "--without-pip", str(install)], check=True)
+    (install / "bin" / "pants").write_text(
+        dedent(
+            """\
+            import sys
+
+            args = sys.argv[1:]
+            if "--version" in args:
+                prefix = "--pants-version="
+                print(next(arg[len(prefix):] for arg in args if arg.startswith(prefix)))
+            """
+        )
+    )
+
+    if manifest:
+        stat = os.stat(python_realpath)
+        (install / "bootstrap-manifest").write_text(
+            "\n".join(
+                (
+                    "format=1",
+                    f"pants_version={pants_version}",
+                    f"python_realpath={python_realpath}",
+                    f"python_signature={int(stat.st_mtime)}:{stat.st_size}",
+                    "complete=true",
+                    "",
+                )
+            )
+        )
+
+    bootstrapped = bootstrap / f"{pants_version}_py{major}{minor}"
+    bootstrapped.symlink_to(install)
+    return bootstrapped
+
+
+def stub_pip(venv: Path) -> None:
+    """Stand in for pip in the given venv, recording what it is asked to install to `pip.log`."""
+    pip = venv / "bin" / "pip"
+    pip.write_text(
+        dedent(
+            f"""\
+            #!{shutil.which("bash")}
+            echo "$@" > "${{0%/bin/pip}}/pip.log"
+            """
+        )
+    )
+    pip.chmod(0o755)
+
+
+class SeedCache:
+    """A `PANTS_SETUP_CACHE` shared by a test session, so each test need not bootstrap Pants anew.
+
+    Each Pants venv is bootstrapped into the seed once, and tests then clone the seed into their own
+    `PANTS_SETUP_CACHE`. Clones link to the seed's venvs and hardlink its PEXes, which `./pants`
+    only ever replaces, never rewrites; everything else (e.g.: digest sidecars) is copied. The one
+    write `./pants` makes to a venv it launches, marking the Pants native client executable, is
+    made when seeding. So a clone is cheap and tests cannot write through it into the seed. Since
+    `./pants` locks what it bootstraps, several test processes (e.g.: pytest-xdist workers) can
+    share one seed.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._seeded: Set[Hashable] = set()
+
+    @property
+    def setup_cache(self) -> Path:
+        return self.root / "PANTS_SETUP_CACHE"
+
+    def seed(self, key: Hashable, *, pants_version: str, env: Mapping[str, str]) -> None:
+        """Bootstrap the venv `./pants` would use for `pants_version` under `env`, once per key."""
+        if key in self._seeded:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix="build_root.", dir=str(self.root)) as build_root:
+            create_pants_config(parent_folder=Path(build_root), pants_version=pants_version)
+            shutil.copy("./pants", build_root)
+            subprocess.run(
+                ["./pants", "--version"],
+                cwd=build_root,
+                env={**env, "PANTS_SETUP_CACHE": str(self.setup_cache)},
+                check=True,
+                stdout=subprocess.DEVNULL,
+            )
+        for native_client in self.setup_cache.glob(
+            "bootstrap-*/*/lib/python*/site-packages/pants/bin/native_client"
+        ):
+            native_client.chmod(native_client.stat().st_mode | 0o111)
+        self._seeded.add(key)
+
+    def clone_into(self, setup_cache: Path) -> None:
+        """Make the venvs bootstrapped into the seed so far available in `setup_cache`."""
+        for seed_bootstrap in self.setup_cache.glob("bootstrap-*"):
+            bootstrap = setup_cache / seed_bootstrap.name
+            bootstrap.mkdir(parents=True, exist_ok=True)
+            for entry in seed_bootstrap.iterdir():
+                clone = bootstrap / entry.name
+                if clone.exists() or clone.is_symlink():
+                    continue
+                if entry.is_symlink():
+                    # A venv: link to the seed's copy, whose absolute paths it must keep.
+                    clone.symlink_to(os.readlink(str(entry)))
+                elif entry.suffix in (".lock", ".last-used") or entry.name.startswith("pants."):
+                    # Per-cache state, or a venv install only reachable through its symlink.
+                    continue
+                elif entry.is_dir():
+                    shutil.copytree(str(entry), str(clone), copy_function=self._clone_file)
+                else:
+                    self._clone_file(str(entry), str(clone))
+
+    @staticmethod
+    def _clone_file(src: str, dst: str) -> None:
+        if src.endswith(".pex") or os.path.basename(src) == "pex":
+            os.link(src, dst)
+        else:
+            shutil.copy2(src, dst)
+
+
+class QuietHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+    def __init__(self, *args: Any, requests: Optional[List[str]] = None, **kwargs: Any) -> None:
+        self.requests = requests
+        super().__init__(*args, **kwargs)
+
+    def log_request(self, code: Any = "-", size: Any = "-") -> None:
+        if self.requests is not None:
+            self.requests.append(self.path)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@contextmanager
+def serve(directory: Path, requests: Optional[List[str]] = None) -> Iterator[str]:
+    """Serve the given directory over http on localhost, yielding the base URL.
+
+    If given a list, the path of each request served is appended to it.
+    """
+    handler = functools.partial(
+        QuietHTTPRequestHandler, directory=str(directory), requests=requests
+    )
+    with http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield f"http://127.0.0.1:{server.server_address[1]}"
+        finally:
+            server.shutdown()
+
+
+class RecordingProxyHandler(QuietHTTPRequestHandler):
+    """Serves `/<host>/<path>` from a recording of `https://<host>/<path>`, recording it first if
+    asked to.
+
+    Absolute https URLs in the HTML pages served (e.g.: the links from PyPI's simple index to the
+    files it hosts) are rewritten to go through the proxy as well.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        recordings: Path,
+        record: bool,
+        missing: List[str],
+        latency: float,
+        bytes_per_second: Optional[int],
+        **kwargs: Any,
+    ) -> None:
+        self.recordings = recordings
+        self.record_missing = record
+        self.missing = missing
+        self.latency = latency
+        self.bytes_per_second = bytes_per_second
+        super().__init__(*args, **kwargs)
+
+    def recording_path(self) -> Path:
+        path = self.path.split("#", 1)[0].lstrip("/")
+        if path.endswith("/"):
+            path += "__index__"
+        return self.recordings / path.replace("?", "__query__")
+
+    def record(self, recording: Path) -> None:
+        url = f"https://{self.path.split('#', 1)[0].lstrip('/')}"
+        # N.B.: We ask indexes for HTML since that is what we know how to rewrite.
+        request = urllib.request.Request(url, headers={"Accept": "text/html, */*"})
+        with urllib.request.urlopen(request) as response:
+            content_type = response.headers.get("Content-Type", "application/octet-stream")
+            content = response.read()
+        recording.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=recording.parent, delete=False) as fp:
+            fp.write(content)
+        Path(f"{recording}.content-type").write_text(content_type)
+        os.replace(fp.name, recording)
+
+    def load(self) -> Tuple[str, bytes]:
+        recording = self.recording_path()
+        if not recording.is_file():
+            if not self.record_missing:
+                self.missing.append(self.path)
+                raise FileNotFoundError(f"No recording of {self.path} at {recording}.")
+            self.record(recording)
+        content_type = Path(f"{recording}.content-type").read_text()
+        content = recording.read_bytes()
+        if content_type.startswith("text/html"):
+            base = f"http://{self.headers['Host']}"
+            content = re.sub(rb"https://([^/\"'\s]+)", base.encode() + rb"/\1", content)
+        return content_type, content
+
+    def do_HEAD(self) -> None:
+        self.respond(send_body=False)
+
+    def do_GET(self) -> None:
+        self.respond(send_body=True)
+
+    def respond(self, send_body: bool) -> None:
+        time.sleep(self.latency)
+        try:
+            content_type, content = self.load()
+        except urllib.error.HTTPError as e:
+            self.send_error(e.code, e.reason)
+            return
+        except FileNotFoundError as e:
+            self.send_error(404, str(e))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        if not send_body:
+            return
+        chunk_size = self.bytes_per_second or len(content) or 1
+        for offset in range(0, len(content), chunk_size):
+            self.wfile.write(content[offset : offset + chunk_size])
+            if self.bytes_per_second:
+                time.sleep(1)
+
+
+@dataclass(frozen=True)
+class ArtifactServer:
+    url: str
+    # The paths requested of the server that it had no recording of.
+    missing: List[str]
+
+
+@contextmanager
+def serve_recordings(
+    recordings: Path,
+    *,
+    record: bool = False,
+    missing: Optional[List[str]] = None,
+    latency: float = 0.0,
+    bytes_per_second: Optional[int] = None,
+) -> Iterator[str]:
+    """Serve recordings of artifacts on the web over http on localhost, yielding the base URL.
+
+    The artifact at `https://<host>/<path>` is served from `<base URL>/<host>/<path>`. Artifacts
+    not yet recorded are a 404, with their paths appended to `missing` if given, unless asked to
+    record them, in which case they are fetched and recorded. Each response can be delayed by the
+    given latency (in seconds) and throttled to the given bandwidth.
+    """
+    handler = functools.partial(
+        RecordingProxyHandler,
+        recordings=recordings,
+        record=record,
+        missing=[] if missing is None else missing,
+        latency=latency,
+        bytes_per_second=bytes_per_second,
+    )
+    with http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield f"http://127.0.0.1:{server.server_address[1]}"
+        finally:
+            server.shutdown()
@@ -0,0 +1,280 @@
+# Copyright 2023 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+"""Benchmark the overhead `./pants` adds before it `exec`s Pants, mostly against fake Pants venvs.
+
+Each scenario runs `PANTS_BENCHMARK_RUNS` times (5 by default) and reports percentiles of its
+timings. If `PANTS_BENCHMARK_BASELINE` names a JSON file, the median of each timing is checked
+against the median recorded there and fails if it regressed by more than
+`PANTS_BENCHMARK_THRESHOLD` (0.25, i.e. 25%, by default) plus a little slack for noise. Timings
+missing from the baseline, or all of them when `PANTS_BENCHMARK_UPDATE_BASELINE` is set, are
+recorded to the baseline instead.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import textwrap
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Mapping, Optional, Sequence
+
+import pytest
+from helpers import (
+    ArtifactServer,
+    bootstrap_dir,
+    create_fake_pants_venv,
+    create_pants_config,
+    stub_pip,
+)
+
+# Differences smaller than this are noise rather than regressions, however they compare in
+# relative terms.
+NOISE_SECONDS = 0.005
+
+
+@dataclass(frozen=True)
+class Timings:
+    seconds: Sequence[float]
+
+    def percentile(self, percent: int) -> float:
+        ordered = sorted(self.seconds)
+        return ordered[min(len(ordered) - 1, (len(ordered) * percent) // 100)]
+
+    def summary(self) -> Dict[str, float]:
+        return {f"p{percent}": self.percentile(percent) for percent in (50, 90, 100)}
+
+
+@dataclass(frozen=True)
+class LauncherBenchmark:
+    build_root: Path
+    setup_cache: Path
+    python: str
+
+    @property
+    def runs(self) -> int:
+        return int(os.environ.get("PANTS_BENCHMARK_RUNS", "5"))
+
+    def time_command(
+        self, args: Sequence[str], env: Optional[Mapping[str, str]] = None
+    ) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            args,
+            cwd=self.build_root,
+            env={**os.environ, "PYTHON": self.python, **(env or {})},
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+
+    def measure(
+        self,
+        args: Sequence[str],
+        env: Optional[Mapping[str, str]] = None,
+        before_each: Callable[[], None] = lambda: None,
+    ) -> Timings:
+        seconds = []
+        for _ in range(self.runs):
+            before_each()
+            start = time.perf_counter()
+            self.time_command(args, env=env)
+            seconds.append(time.perf_counter() - start)
+        return Timings(seconds)
+
+    def invalidate_launch_stamp(self) -> None:
+        (self.build_root / "pants.toml").touch()
+
+    def forget_interpreters(self) -> None:
+        self.invalidate_launch_stamp()
+        interpreters = self.setup_cache / "interpreters"
+        if interpreters.exists():
+            interpreters.unlink()
+
+    def trace_phases(
+        self,
+        args: Sequence[str],
+        env: Optional[Mapping[str, str]] = None,
+        before_each: Callable[[], None] = lambda: None,
+    ) -> Dict[str, Timings]:
+        """Times each phase of the launch recorded by `PANTS_BOOTSTRAP_TRACE`, summing repeats."""
+        trace = self.build_root / "trace.json"
+        phases: Dict[str, List[float]] = defaultdict(list)
+        for _ in range(self.runs):
+            before_each()
+            if trace.exists():
+                trace.unlink()
+            self.time_command(args, env={**(env or {}), "PANTS_BOOTSTRAP_TRACE": str(trace)})
+            totals: Dict[str, float] = defaultdict(float)
+            for line in trace.read_text().splitlines():
+                event = json.loads(line)
+                totals[event["name"]] += event["dur"] / 1_000_000
+            for name, total in totals.items():
+                phases[name].append(total)
+        return {name: Timings(seconds) for name, seconds in phases.items()}
+
+
+@pytest.fixture
+def benchmark(build_root: Path, python: str) -> LauncherBenchmark:
+    return LauncherBenchmark(
+        build_root=build_root, setup_cache=Path(os.environ["PANTS_SETUP_CACHE"]), python=python
+    )
+
+
+def check_against_baseline(scenario: str, timings: Mapping[str, Timings]) -> None:
+    for name, timing in timings.items():
+        print(f"{scenario}.{name}: {json.dumps(timing.summary())}")
+
+    baseline_path = os.environ.get("PANTS_BENCHMARK_BASELINE")
+    if not baseline_path:
+        return
+    baseline_file = Path(baseline_path)
+    baseline = json.loads(baseline_file.read_text()) if baseline_file.exists() else {}
+    threshold = float(os.environ.get("PANTS_BENCHMARK_THRESHOLD", "0.25"))
+    update = bool(os.environ.get("PANTS_BENCHMARK_UPDATE_BASELINE"))
+
+    regressions = []
+    for name, timing in timings.items():
+        key = f"{scenario}.{name}"
+        if update or key not in baseline:
+            baseline[key] = timing.summary()
+            continue
+        expected = baseline[key]["p50"]
+        actual = timing.percentile(50)
+        if actual > expected * (1 + threshold) + NOISE_SECONDS:
+            regressions.append(f"{key}: the median went from {expected:.4f}s to {actual:.4f}s")
+    baseline_file.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+    assert not regressions, "\n".join(regressions)
+
+
+def test_warm_launch_overhead(benchmark: LauncherBenchmark) -> None:
+    venv = create_fake_pants_venv(
+        setup_cache=benchmark.setup_cache, pants_version="2.17.0", python=benchmark.python
+    )
+    create_pants_config(parent_folder=benchmark.build_root, pants_version="2.17.0")
+    benchmark.time_command(["./pants", "--version"])
+
+    launcher = benchmark.measure(["./pants", "--version"])
+    direct = benchmark.measure(
+        [
+            str(venv / "bin" / "python"),
+            str(venv / "bin" / "pants"),
+            "--pants-version=2.17.0",
+            "--version",
+        ]
+    )
+    overhead = Timings(
+        [max(0.0, a - b) for a, b in zip(sorted(launcher.seconds), sorted(direct.seconds))]
+    )
+    check_against_baseline("warm_launch", {"overhead": overhead})
+
+
+def test_interpreter_discovery(benchmark: LauncherBenchmark, tmp_path: Path) -> None:
+    create_fake_pants_venv(
+        setup_cache=benchmark.setup_cache, pants_version="2.17.0", python=benchmark.python
+    )
+    create_pants_config(parent_folder=benchmark.build_root, pants_version="2.17.0")
+
+    # Stand in for an interpreter shim that re-dispatches to the real interpreter.
+    shims = tmp_path / "shims"
+    shims.mkdir()
+    shim = shims / Path(benchmark.python).name
+    shim.write_text(
+        textwrap.dedent(
+            f"""\
+            #!{shutil.which("bash")}
+            exec {Path(benchmark.python).resolve()} "$@"
+            """
+        )
+    )
+    shim.chmod(0o755)
+
+    timings = {}
+    for kind, python in (("direct", benchmark.python), ("shim", str(shim))):
+        env = {"PYTHON": python}
+        timings[f"{kind}.probed"] = benchmark.measure(
+            ["./pants", "--version"], env=env, before_each=benchmark.forget_interpreters
+        )
+        timings[f"{kind}.indexed"] = benchmark.measure(
+            ["./pants", "--version"], env=env, before_each=benchmark.invalidate_launch_stamp
+        )
+    check_against_baseline("interpreter_discovery", timings)
+
+
+def test_cold_bootstrap_phases(
+    benchmark: LauncherBenchmark, artifact_server: Optional[ArtifactServer], tmp_path: Path
+) -> None:
+    """Times each phase of bootstrapping Pants from scratch, from downloading Pex to installing it.
+
+    This installs a real Pants; so it only runs against recorded downloads (see `artifact_server`).
+    """
+    if artifact_server is None:
+        pytest.skip(
+            "Bootstrapping from scratch is only benchmarked with PANTS_TEST_RECORDINGS set."
+        )
+    create_pants_config(parent_folder=benchmark.build_root, pants_version="2.12.0")
+    # N.B.: Pex and pip cache what they download outside of the bootstrap dir; so we give them
+    # caches of their own to clear along with it.
+    pex_root = tmp_path / "pex_root"
+    pip_cache = tmp_path / "pip_cache"
+
+    def forget_bootstrap() -> None:
+        benchmark.invalidate_launch_stamp()
+        for path in (bootstrap_dir(benchmark.setup_cache), pex_root, pip_cache):
+            shutil.rmtree(path, ignore_errors=True)
+
+    timings = benchmark.trace_phases(
+        ["./pants", "--version"],
+        env={"PEX_ROOT": str(pex_root), "PIP_CACHE_DIR": str(pip_cache)},
+        before_each=forget_bootstrap,
+    )
+    check_against_baseline("cold_bootstrap", timings)
+
+
+def test_clone_bootstrap_phases(benchmark: LauncherBenchmark) -> None:
+    """Times each phase of bootstrapping by cloning a nearby venv (see `PANTS_BOOTSTRAP_CLONE`).
+
+    Only the clone is measured: the source venv is fake and its pip is stubbed out; so this needs no
+    network.
+    """
+    stub_pip(
+        create_fake_pants_venv(
+            setup_cache=benchmark.setup_cache,
+            pants_version="2.16.0",
+            python=benchmark.python,
+            manifest=True,
+        )
+    )
+    create_pants_config(parent_folder=benchmark.build_root, pants_version="2.17.0")
+    bootstrap = bootstrap_dir(benchmark.setup_cache)
+
+    def forget_bootstrap() -> None:
+        benchmark.invalidate_launch_stamp()
+        for venv in bootstrap.glob("2.17.0_py*"):
+            if venv.is_symlink():
+                shutil.rmtree(venv.resolve().parent)
+                venv.unlink()
+
+    timings = benchmark.trace_phases(
+        ["./pants", "--version"], env={"PANTS_BOOTSTRAP_CLONE": "1"}, before_each=forget_bootstrap
+    )
+    check_against_baseline("clone_bootstrap", timings)
+
+
+def test_bootstrap_cache_key(benchmark: LauncherBenchmark) -> None:
+    create_fake_pants_venv(
+        setup_cache=benchmark.setup_cache, pants_version="2.17.0", python=benchmark.python
+    )
+    create_pants_config(parent_folder=benchmark.build_root, pants_version="2.17.0")
+    env = {"PANTS_BOOTSTRAP_TOOLS": "1"}
+
+    timings = {
+        "cold": benchmark.measure(
+            ["./pants", "bootstrap-cache-key"], env=env, before_each=benchmark.forget_interpreters
+        ),
+    }
+    benchmark.time_command(["./pants", "--version"])
+    timings["warm"] = benchmark.measure(["./pants", "bootstrap-cache-key"], env=env)
+    check_against_baseline("bootstrap_cache_key", timings)
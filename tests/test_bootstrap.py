@@ -0,0 +1,885 @@
+# Copyright 2023 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+"""Test the `./pants` launcher's bootstrap caching and tooling against fake Pants venvs."""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import textwrap
+import time
+from pathlib import Path
+from typing import Any, Callable, Mapping, Optional, Tuple
+
+import pytest
+from helpers import bootstrap_dir, create_fake_pants_venv, create_pants_config, serve, stub_pip
+
+
+@pytest.fixture
+def setup_cache(build_root: Path) -> Path:
+    return Path(os.environ["PANTS_SETUP_CACHE"])
+
+
+def run_pants(
+    build_root: Path, *args: str, env: Optional[Mapping[str, str]] = None
+) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        ["./pants", *args],
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        cwd=str(build_root),
+        env={**os.environ, **(env or {})},
+    )
+
+
+def test_warm_runs_launch_from_stamp(
+    build_root: Path, setup_cache: Path, python: str, tmp_path: Path
+) -> None:
+    create_fake_pants_venv(setup_cache=setup_cache, pants_version="2.12.0", python=python)
+    create_fake_pants_venv(setup_cache=setup_cache, pants_version="2.13.0", python=python)
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+
+    # Record every `uname` fork so we can tell whether a run resolved from scratch.
+    tools = tmp_path / "tools"
+    tools.mkdir()
+    uname_log = tmp_path / "uname.log"
+    uname = tools / "uname"
+    uname.write_text(
+        textwrap.dedent(
+            f"""\
+            #!{shutil.which("bash")}
+            echo "$@" >> {uname_log}
+            exec {shutil.which("uname")} "$@"
+            """
+        )
+    )
+    uname.chmod(0o755)
+    env = {"PATH": f"{tools}{os.pathsep}{os.environ['PATH']}", "PYTHON": python}
+
+    assert "2.12.0" == run_pants(build_root, "--version", env=env).stdout.strip()
+    assert uname_log.read_text()
+
+    uname_log.unlink()
+    assert "2.12.0" == run_pants(build_root, "--version", env=env).stdout.strip()
+    assert not uname_log.exists()
+
+    create_pants_config(parent_folder=build_root, pants_version="2.13.0")
+    assert "2.13.0" == run_pants(build_root, "--version", env=env).stdout.strip()
+    assert uname_log.read_text()
+
+    assert (
+        "2.12.0"
+        == run_pants(build_root, "--version", env={**env, "PANTS_VERSION": "2.12.0"}).stdout.strip()
+    )
+
+
+def test_interpreter_discovery_is_indexed(
+    build_root: Path, setup_cache: Path, python: str, tmp_path: Path
+) -> None:
+    create_fake_pants_venv(setup_cache=setup_cache, pants_version="2.12.0", python=python)
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+
+    # Stand in for a slow interpreter shim, recording each time it's run.
+    tools = tmp_path / "tools"
+    tools.mkdir()
+    python_log = tmp_path / "python.log"
+    shim = tools / "python3.9"
+    shim.write_text(
+        textwrap.dedent(
+            f"""\
+            #!{shutil.which("bash")}
+            echo "$@" >> {python_log}
+            exec {Path(python).resolve()} "$@"
+            """
+        )
+    )
+    shim.chmod(0o755)
+    env = {"PATH": f"{tools}{os.pathsep}{os.environ['PATH']}"}
+
+    assert "2.12.0" == run_pants(build_root, "--version", env=env).stdout.strip()
+    assert 1 == len(python_log.read_text().splitlines())
+
+    # Invalidate the launch stamp so that discovery runs again, this time from the index.
+    python_log.unlink()
+    (build_root / "pants.toml").touch()
+    assert "2.12.0" == run_pants(build_root, "--version", env=env).stdout.strip()
+    assert not python_log.exists()
+
+    interpreters = run_pants(build_root, "interpreters", env={**env, "PANTS_BOOTSTRAP_TOOLS": "2"})
+    assert f"python_path={shim} " in interpreters.stdout
+
+
+def test_interpreter_pins_above_the_buildroot(
+    build_root: Path, setup_cache: Path, python: str, tmp_path: Path
+) -> None:
+    create_fake_pants_venv(setup_cache=setup_cache, pants_version="2.12.0", python=python)
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+
+    # Stand in for a pyenv shim, which picks the interpreter pinned in the nearest version file.
+    shims = tmp_path / "shims"
+    shims.mkdir()
+    python_log = tmp_path / "python.log"
+    shim = shims / "python3.9"
+    shim.write_text(
+        textwrap.dedent(
+            f"""\
+            #!{shutil.which("bash")}
+            echo "$@" >> {python_log}
+            exec {Path(python).resolve()} "$@"
+            """
+        )
+    )
+    shim.chmod(0o755)
+    pin = build_root.parent / ".python-version"
+    pin.write_text("3.9\n")
+    env = {"PATH": f"{shims}{os.pathsep}{os.environ['PATH']}"}
+
+    assert "2.12.0" == run_pants(build_root, "--version", env=env).stdout.strip()
+    assert 1 == len(python_log.read_text().splitlines())
+    python_log.unlink()
+    assert "2.12.0" == run_pants(build_root, "--version", env=env).stdout.strip()
+    assert not python_log.exists()
+
+    # Re-pinning invalidates both the launch stamp and the index entry.
+    pin.write_text("3.9.99\n")
+    assert "2.12.0" == run_pants(build_root, "--version", env=env).stdout.strip()
+    assert 1 == len(python_log.read_text().splitlines())
+
+
+def test_interpreter_global_version_changes(
+    build_root: Path, setup_cache: Path, python: str, tmp_path: Path
+) -> None:
+    create_fake_pants_venv(setup_cache=setup_cache, pants_version="2.12.0", python=python)
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+
+    # Stand in for a pyenv shim, which falls back to the global version when nothing is pinned.
+    shims = tmp_path / "shims"
+    shims.mkdir()
+    python_log = tmp_path / "python.log"
+    shim = shims / "python3.9"
+    shim.write_text(
+        textwrap.dedent(
+            f"""\
+            #!{shutil.which("bash")}
+            echo "$@" >> {python_log}
+            exec {Path(python).resolve()} "$@"
+            """
+        )
+    )
+    shim.chmod(0o755)
+    pyenv_root = tmp_path / "pyenv"
+    pyenv_root.mkdir()
+    env = {"PATH": f"{shims}{os.pathsep}{os.environ['PATH']}", "PYENV_ROOT": str(pyenv_root)}
+
+    def assert_probes(expected: int, **extra_env: str) -> None:
+        assert (
+            "2.12.0" == run_pants(build_root, "--version", env={**env, **extra_env}).stdout.strip()
+        )
+        assert expected == (len(python_log.read_text().splitlines()) if python_log.exists() else 0)
+        if python_log.exists():
+            python_log.unlink()
+
+    assert_probes(1)
+    assert_probes(0)
+
+    # Both `pyenv global` and switching the asdf version re-resolve the shim rather than re-using
+    # the launch stamp.
+    (pyenv_root / "version").write_text("3.9.99\n")
+    assert_probes(1)
+    assert_probes(0)
+    assert_probes(1, ASDF_PYTHON_VERSION="3.9.99")
+    assert_probes(0, ASDF_PYTHON_VERSION="3.9.99")
+
+
+def test_version_for_sha_is_cached(
+    build_root: Path, setup_cache: Path, python: str, tmp_path: Path
+) -> None:
+    sha = "e4a00eb2750d00371cfe1d438c872ec3ea926369"
+    version = "2.12.0.dev0+gite4a00eb2"
+    create_fake_pants_venv(setup_cache=setup_cache, pants_version=version, python=python)
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+
+    mirror = tmp_path / "mirror"
+    version_file = mirror / "pantsbuild" / "pants" / sha / "src" / "python" / "pants" / "VERSION"
+    version_file.parent.mkdir(parents=True)
+    version_file.write_text("2.12.0.dev0\n")
+
+    env = {"PANTS_SHA": sha, "PYTHON": python}
+    with serve(mirror) as url:
+        env["PANTS_GITHUB_RAW_URL"] = url
+        assert version == run_pants(build_root, "--version", env=env).stdout.strip()
+    assert "2.12.0.dev0\n" == (setup_cache / "sha-versions" / sha).read_text()
+
+    # With the mirror gone, we must now resolve the version without touching the network.
+    (build_root / "pants.toml").touch()
+    assert version == run_pants(build_root, "--version", env=env).stdout.strip()
+
+
+def test_bootstrap_gc_evicts_least_recently_used(
+    build_root: Path, setup_cache: Path, python: str
+) -> None:
+    venvs = {
+        version: create_fake_pants_venv(
+            setup_cache=setup_cache, pants_version=version, python=python
+        )
+        for version in ("2.11.0", "2.12.0", "2.13.0")
+    }
+    leaked_staging_dir = venvs["2.11.0"].parent / "pants.leaked"
+    leaked_staging_dir.mkdir()
+
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+    run_pants(build_root, "--version", env={"PYTHON": python})
+    assert venvs["2.12.0"].with_name(f"{venvs['2.12.0'].name}.last-used").exists()
+
+    # The venv just launched is the most recently used, and a day ago 2.11.0 was used after 2.13.0.
+    day = 24 * 60 * 60
+    for version, days_ago in (("2.11.0", 1), ("2.13.0", 2)):
+        last_used = venvs[version].with_name(f"{venvs[version].name}.last-used")
+        last_used.touch()
+        os.utime(last_used, (last_used.stat().st_atime - days_ago * day,) * 2)
+
+    gc_env = {"PANTS_BOOTSTRAP_TOOLS": "3", "PYTHON": python}
+    dry_run = run_pants(build_root, "bootstrap-gc", "--max-venvs", "1", "--dry-run", env=gc_env)
+    assert "Would remove 2.13.0_py" in dry_run.stderr
+    assert all(venv.exists() for venv in venvs.values())
+    assert leaked_staging_dir.exists()
+
+    run_pants(build_root, "bootstrap-gc", "--max-venvs", "2", env=gc_env)
+    assert not leaked_staging_dir.exists()
+    assert {"2.11.0", "2.12.0"} == {version for version, venv in venvs.items() if venv.exists()}
+
+    result = run_pants(build_root, "bootstrap-gc", "--max-bytes", "1", env=gc_env)
+    assert "Keeping 2.12.0_py" in result.stderr
+    assert {"2.12.0"} == {version for version, venv in venvs.items() if venv.exists()}
+    assert 1 == len(list(venvs["2.12.0"].parent.glob("pants.*")))
+
+
+def test_bootstrap_trace(build_root: Path, setup_cache: Path, python: str) -> None:
+    create_fake_pants_venv(setup_cache=setup_cache, pants_version="2.12.0", python=python)
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+
+    trace = build_root / "trace.json"
+    env = {"PANTS_BOOTSTRAP_TRACE": trace.name, "PYTHON": python}
+
+    def traced_run() -> Mapping[str, Any]:
+        trace.unlink(missing_ok=True)
+        assert "2.12.0" == run_pants(build_root, "--version", env=env).stdout.strip()
+        events = [json.loads(line) for line in trace.read_text().splitlines()]
+        assert all("X" == event["ph"] and event["dur"] >= 0 for event in events)
+        return {event["name"]: event["args"].get("outcome") for event in events}
+
+    cold = traced_run()
+    assert "miss" == cold["launch_stamp"]
+    assert "hit" == cold["bootstrap_pants"]
+    assert {"determine_pants_version", "determine_python_exe", "time_to_exec"} <= cold.keys()
+
+    assert {"launch_stamp": "hit", "time_to_exec": None} == traced_run()
+
+
+def test_bootstrap_export_import(
+    build_root: Path, setup_cache: Path, python: str, tmp_path: Path
+) -> None:
+    create_fake_pants_venv(setup_cache=setup_cache, pants_version="2.12.0", python=python)
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+
+    bundle = tmp_path / "bundle.tar.gz"
+    tools_env = {"PANTS_BOOTSTRAP_TOOLS": "4", "PYTHON": python}
+    exported = run_pants(build_root, "bootstrap-export", "--output", str(bundle), env=tools_env)
+    assert str(bundle) == exported.stdout.strip()
+
+    other_setup_cache = tmp_path / "other_setup_cache"
+    env = {**tools_env, "PANTS_SETUP_CACHE": str(other_setup_cache)}
+    imported = Path(run_pants(build_root, "bootstrap-import", str(bundle), env=env).stdout.strip())
+    assert imported.is_symlink()
+    assert imported.parent == bootstrap_dir(other_setup_cache)
+    assert str(imported.resolve()) in (imported / "bin" / "activate").read_text()
+    assert str(setup_cache) not in (imported / "bin" / "activate").read_text()
+
+    # Importing again leaves the venv as is.
+    assert (
+        str(imported)
+        == run_pants(build_root, "bootstrap-import", str(bundle), env=env).stdout.strip()
+    )
+    assert 1 == len(list(imported.parent.glob("pants.*")))
+
+    del env["PANTS_BOOTSTRAP_TOOLS"]
+    assert "2.12.0" == run_pants(build_root, "--version", env=env).stdout.strip()
+
+
+def test_clone_nearest_venv(build_root: Path, setup_cache: Path, python: str) -> None:
+    venvs = {
+        version: create_fake_pants_venv(
+            setup_cache=setup_cache, pants_version=version, python=python, manifest=True
+        )
+        for version in ("2.10.0", "2.11.0", "2.13.0")
+    }
+    for venv in venvs.values():
+        stub_pip(venv)
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+
+    result = run_pants(
+        build_root, "--version", env={"PANTS_BOOTSTRAP_CLONE": "1", "PYTHON": python}
+    )
+    assert "2.12.0" == result.stdout.strip()
+    assert "Upgrading a clone of 2.11.0_py" in result.stderr
+
+    clone = venvs["2.11.0"].with_name(venvs["2.11.0"].name.replace("2.11.0", "2.12.0"))
+    assert clone.resolve() != venvs["2.11.0"].resolve()
+    assert "pantsbuild.pants==2.12.0" in (clone / "pip.log").read_text().split()
+    assert str(clone.resolve()) in (clone / "bin" / "activate").read_text()
+    assert not (venvs["2.11.0"] / "pip.log").exists()
+    assert str(venvs["2.11.0"].resolve()) in (venvs["2.11.0"] / "bin" / "activate").read_text()
+
+
+def test_clone_only_venvs_built_by_the_same_interpreter(
+    build_root: Path, setup_cache: Path, python: str
+) -> None:
+    venvs = {
+        version: create_fake_pants_venv(
+            setup_cache=setup_cache, pants_version=version, python=python, manifest=True
+        )
+        for version in ("2.10.0", "2.11.0")
+    }
+    for venv in venvs.values():
+        stub_pip(venv)
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+
+    # The nearest venv was built by another interpreter of the same major and minor version.
+    manifest = venvs["2.11.0"] / "bootstrap-manifest"
+    manifest.write_text(
+        re.sub(r"(?m)^python_realpath=.*$", "python_realpath=/other/python", manifest.read_text())
+    )
+
+    result = run_pants(
+        build_root, "--version", env={"PANTS_BOOTSTRAP_CLONE": "1", "PYTHON": python}
+    )
+    assert "2.12.0" == result.stdout.strip()
+    assert "Upgrading a clone of 2.10.0_py" in result.stderr
+
+
+def test_install_from_lock(
+    build_root: Path, setup_cache: Path, python: str, tmp_path: Path
+) -> None:
+    stub_pip(
+        create_fake_pants_venv(
+            setup_cache=setup_cache, pants_version="2.11.0", python=python, manifest=True
+        )
+    )
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+
+    # Cloning installs with the venv's pip; so we can see how the lock is used without a network.
+    locks = tmp_path / "locks"
+    locks.mkdir()
+    bootstrap = bootstrap_dir(setup_cache)
+    major_minor = next(bootstrap.glob("2.11.0_py*")).name[len("2.11.0_py") :]
+    lock = locks / f"2.12.0_py{major_minor}-{bootstrap.name[len('bootstrap-') :]}.txt"
+    lock.write_text("pantsbuild.pants==2.12.0 --hash=sha256:0000\n")
+
+    # N.B.: Pex would not check the hashes; so pip installs the lock even when Pex was asked to.
+    env = {
+        "PANTS_BOOTSTRAP_CLONE": "1",
+        "PANTS_BOOTSTRAP_ENGINE": "pex",
+        "PANTS_BOOTSTRAP_LOCKS": str(locks),
+        "PYTHON": python,
+    }
+    result = run_pants(build_root, "--version", env=env)
+    assert f"Installing the requirements locked in {lock}" in result.stderr
+    assert "Installing with pip rather than Pex" in result.stderr
+    pip_log = (bootstrap / f"2.12.0_py{major_minor}" / "pip.log").read_text()
+    assert [
+        "install",
+        "--quiet",
+        "--progress-bar",
+        "off",
+        "--no-deps",
+        "--require-hashes",
+        "-r",
+        str(lock),
+    ] == pip_log.split()
+
+
+def test_debugpy_overlay(build_root: Path, setup_cache: Path, python: str) -> None:
+    venv = create_fake_pants_venv(setup_cache=setup_cache, pants_version="2.12.0", python=python)
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+
+    # Stand in for an installed debugpy overlay, reporting how it was launched.
+    overlay = venv.with_name(venv.name.replace("2.12.0", "debugpy-1.6.0"))
+    cli = overlay / "debugpy" / "server" / "cli.py"
+    cli.parent.mkdir(parents=True)
+    (overlay / "debugpy" / "__init__.py").touch()
+    (cli.parent / "__init__.py").touch()
+    cli.write_text(
+        textwrap.dedent(
+            """\
+            import sys
+
+            def main():
+                print(sys.path[0])
+                print(" ".join(sys.argv[1:]))
+            """
+        )
+    )
+
+    env = {"PANTS_DEBUG": "1", "PYTHON": python}
+    for _ in range(2):
+        stdout = run_pants(build_root, "--no-pantsd", "--version", env=env).stdout.splitlines()
+        assert str(overlay) == stdout[-2]
+        assert stdout[-1].startswith("--listen 127.0.0.1:5678 --wait-for-client ")
+        assert stdout[-1].endswith(" --pants-version=2.12.0 --no-pantsd --version")
+    assert [venv] == [path for path in venv.parent.glob("2.12.0_py*") if path.is_symlink()]
+
+
+def test_native_client_with_live_pantsd(build_root: Path, setup_cache: Path, python: str) -> None:
+    venv = create_fake_pants_venv(setup_cache=setup_cache, pants_version="2.17.0", python=python)
+    create_pants_config(parent_folder=build_root, pants_version="2.17.0")
+
+    # Pants wheels ship the native client without its executable bit set.
+    native_client = next((venv / "lib").glob("python*")) / "site-packages/pants/bin/native_client"
+    native_client.parent.mkdir(parents=True)
+    native_client.write_text(
+        textwrap.dedent(
+            f"""\
+            #!{shutil.which("bash")}
+            echo "native $_PANTS_SERVER_EXE $*"
+            """
+        )
+    )
+
+    env = {"PYTHON": python}
+    assert "2.17.0" == run_pants(build_root, "--version", env=env).stdout.strip()
+
+    # Stand in for a live pantsd with the test process itself.
+    pid_file = build_root / ".pids" / "e3b0c442" / "pantsd" / "pid"
+    pid_file.parent.mkdir(parents=True)
+    pid_file.write_text(str(os.getpid()))
+    assert (
+        f"native {venv}/bin/pants --pants-bin-name=./pants --pants-version=2.17.0 --version"
+        == run_pants(build_root, "--version", env=env).stdout.strip()
+    )
+    assert "2.17.0" == (
+        run_pants(
+            build_root, "--version", env={**env, "PANTS_NO_NATIVE_CLIENT": "1"}
+        ).stdout.strip()
+    )
+
+
+def test_venv_manifest(build_root: Path, setup_cache: Path, python: str) -> None:
+    venv = create_fake_pants_venv(setup_cache=setup_cache, pants_version="2.12.0", python=python)
+    stub_pip(
+        create_fake_pants_venv(
+            setup_cache=setup_cache, pants_version="2.11.0", python=python, manifest=True
+        )
+    )
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+    # NB: Any rebuild clones the 2.11.0 venv, which needs no network.
+    env = {"PANTS_BOOTSTRAP_CLONE": "1", "PYTHON": python}
+
+    def run_from_scratch() -> subprocess.CompletedProcess:
+        # Invalidate the launch stamp so that the venv is validated.
+        (build_root / "pants.toml").touch()
+        result = run_pants(build_root, "--version", env=env)
+        assert "2.12.0" == result.stdout.strip()
+        return result
+
+    # Venvs bootstrapped before manifests existed are checked and then given one.
+    install_dir = venv.resolve()
+    result = run_from_scratch()
+    assert "Rebuilding" not in result.stderr
+    manifest = venv / "bootstrap-manifest"
+    assert {"format=1", "pants_version=2.12.0", "complete=true"} <= set(
+        manifest.read_text().splitlines()
+    )
+
+    # An interpreter that changed but still works only has the manifest refreshed.
+    manifest.write_text(manifest.read_text().replace("python_signature=", "python_signature=0:0"))
+    assert "Rebuilding" not in run_from_scratch().stderr
+    assert "python_signature=0:0" not in manifest.read_text()
+    assert install_dir == venv.resolve()
+
+    # A broken venv is rebuilt.
+    (venv / "bin" / "python").unlink()
+    assert f"Rebuilding {venv} since " in run_from_scratch().stderr
+    assert install_dir != venv.resolve()
+    assert (venv / "bootstrap-manifest").is_file()
+
+
+def test_read_only_shared_cache(
+    build_root: Path, setup_cache: Path, python: str, tmp_path: Path
+) -> None:
+    shared_cache = tmp_path / "shared"
+    shared = create_fake_pants_venv(setup_cache=shared_cache, pants_version="2.12.0", python=python)
+    stub_pip(
+        create_fake_pants_venv(
+            setup_cache=setup_cache, pants_version="2.11.0", python=python, manifest=True
+        )
+    )
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+    # NB: Any bootstrap clones the 2.11.0 venv, which needs no network.
+    env = {"PANTS_BOOTSTRAP_CLONE": "1", "PYTHON": python}
+
+    # Give the shared venv its manifest, as an admin bootstrapping it would.
+    run_pants(build_root, "--version", env={**env, "PANTS_SETUP_CACHE": str(shared_cache)})
+    manifest = shared / "bootstrap-manifest"
+    assert manifest.is_file()
+    last_used = shared.with_name(f"{shared.name}.last-used")
+    last_used.unlink()
+    shared_env = {**env, "PANTS_SETUP_CACHE_RO": f"{tmp_path / 'missing'}:{shared_cache}"}
+
+    result = run_pants(build_root, "--version", env=shared_env)
+    assert "2.12.0" == result.stdout.strip()
+    venv = bootstrap_dir(setup_cache) / shared.name
+    assert not venv.exists()
+    assert not last_used.exists()
+
+    # A shared venv built by another interpreter is not used.
+    other_python = tmp_path / "python"
+    other_python.symlink_to(Path(python).resolve())
+    manifest.write_text(
+        re.sub(r"(?m)^python_realpath=.*$", f"python_realpath={other_python}", manifest.read_text())
+    )
+    (build_root / "pants.toml").touch()
+    result = run_pants(build_root, "--version", env=shared_env)
+    assert "2.12.0" == result.stdout.strip()
+    assert f"Not using the shared {shared} since it was built with {other_python}" in result.stderr
+    assert venv.is_dir()
+
+
+def pipelined_bootstrap(
+    build_root: Path, python: str, tmp_path: Path, pip: Optional[str] = None
+) -> Tuple[Path, Callable[..., subprocess.CompletedProcess]]:
+    """Set up a pipelined bootstrap of a fake Pants 2.12.0 venv, needing no network.
+
+    The interpreter has no pip of its own; so it prefetches using the virtualenv PEX, which comes
+    from a shared cache and lays out a venv with the given pip script (by default, `stub_pip`).
+    Returns the venv to be bootstrapped and a function to run `./pants` with.
+    """
+    template = create_fake_pants_venv(
+        setup_cache=tmp_path / "template", pants_version="2.12.0", python=python
+    )
+    stub_pip(template)
+    if pip:
+        (template / "bin" / "pip").write_text(pip)
+    shared_cache = tmp_path / "shared"
+    virtualenv_pex = bootstrap_dir(shared_cache) / "virtualenv-20.4.7" / "virtualenv.pex"
+    virtualenv_pex.parent.mkdir(parents=True)
+    virtualenv_pex.write_text(
+        textwrap.dedent(
+            f"""\
+            import shutil, sys, venv
+
+            venv.create(sys.argv[-1], symlinks=True)
+            for name in ("pants", "pip"):
+                shutil.copy("{template}/bin/" + name, sys.argv[-1] + "/bin/" + name)
+            """
+        )
+    )
+    pipless_python = tmp_path / "pipless"
+    subprocess.run([python, "-m", "venv", "--without-pip", pipless_python], check=True)
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+
+    def run(**env: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            ["./pants", "--version"],
+            cwd=build_root,
+            env={
+                **os.environ,
+                "PANTS_BOOTSTRAP_PIPELINE": "1",
+                "PANTS_SETUP_CACHE_RO": str(shared_cache),
+                "PYTHON": str(pipless_python / "bin" / "python"),
+                **env,
+            },
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=60,
+        )
+
+    return Path(os.environ["PANTS_SETUP_CACHE"]) / bootstrap_dir(Path()) / template.name, run
+
+
+def test_pipeline_with_shared_virtualenv_pex(
+    build_root: Path, setup_cache: Path, python: str, tmp_path: Path
+) -> None:
+    venv, run = pipelined_bootstrap(build_root, python, tmp_path)
+    assert "2.12.0" == run().stdout.strip()
+    assert "--no-index" in (venv / "pip.log").read_text().split()
+    assert not (bootstrap_dir(setup_cache) / "virtualenv-20.4.7").exists()
+
+
+def test_pipeline_timeout(build_root: Path, setup_cache: Path, python: str, tmp_path: Path) -> None:
+    pids = tmp_path / "pids"
+    pip = textwrap.dedent(
+        f"""\
+        #!{shutil.which("bash")}
+        if [[ "$1" == "download" ]]; then
+          sleep 300 &
+          echo $! > {pids}
+          wait
+        fi
+        echo "$@" > "${{0%/bin/pip}}/pip.log"
+        """
+    )
+    venv, run = pipelined_bootstrap(build_root, python, tmp_path, pip=pip)
+
+    result = run(PANTS_BOOTSTRAP_PIPELINE_TIMEOUT="1")
+    assert "2.12.0" == result.stdout.strip()
+    assert "installing from the index instead" in result.stderr
+    assert "--no-index" not in (venv / "pip.log").read_text().split()
+    # The prefetch was killed along with the pip it started.
+    stray_pid = int(pids.read_text())
+    with pytest.raises(ProcessLookupError):
+        for _ in range(100):
+            os.kill(stray_pid, 0)
+            time.sleep(0.1)
+
+
+@pytest.mark.parametrize("hardlinked", [False, True])
+def test_optimized_venv(
+    build_root: Path, setup_cache: Path, python: str, tmp_path: Path, hardlinked: bool
+) -> None:
+    # Stand in for pip installing a package with a test suite, a Windows launcher and `.pth` files;
+    # one of which, if `hardlinked`, is shared with another tree, as when Pex lays out a venv.
+    shared = tmp_path / "shared.pth"
+    shared.write_text("import sys; sys.optimized = True\n")
+    pip = textwrap.dedent(
+        f"""\
+        #!{shutil.which("bash")}
+        site_packages="$(echo "${{0%/bin/pip}}"/lib/python*/site-packages)"
+        mkdir -p "${{site_packages}}/extra" "${{site_packages}}/lib/tests"
+        touch "${{site_packages}}/lib/__init__.py" "${{site_packages}}/lib/launcher.exe"
+        echo extra > "${{site_packages}}/a.pth"
+        {"ln -f" if hardlinked else "cp"} {shared} "${{site_packages}}/b.pth"
+        """
+    )
+    venv, run = pipelined_bootstrap(build_root, python, tmp_path, pip=pip)
+
+    result = run(PANTS_BOOTSTRAP_OPTIMIZE="1")
+    assert "2.12.0" == result.stdout.strip()
+    assert "Optimized the virtual environment for startup: " in result.stderr
+    (site_packages,) = venv.glob("lib/python*/site-packages")
+    assert list((site_packages / "lib" / "__pycache__").glob("__init__.*.pyc"))
+    assert (
+        f"{site_packages / 'extra'} True"
+        == subprocess.run(
+            [venv / "bin" / "python", "-c", "import sys; print(sys.path[-1], sys.optimized)"],
+            check=True,
+            stdout=subprocess.PIPE,
+            text=True,
+        ).stdout.strip()
+    )
+    pth_files = sorted(pth.name for pth in site_packages.glob("*.pth"))
+    if hardlinked:
+        # A venv sharing files with another tree is only compiled.
+        assert ["a.pth", "b.pth"] == pth_files
+        assert (site_packages / "lib" / "tests").is_dir()
+        assert (site_packages / "lib" / "launcher.exe").is_file()
+        assert not (venv / "bootstrap-pruned").exists()
+        return
+
+    assert ["pants-bootstrap-merged.pth"] == pth_files
+    assert not (site_packages / "lib" / "tests").exists()
+    assert not (site_packages / "lib" / "launcher.exe").exists()
+    assert (venv / "bootstrap-pruned").is_file()
+
+    # Since pip could not upgrade it, a pruned venv is not cloned.
+    create_pants_config(parent_folder=build_root, pants_version="2.13.0")
+    result = run(PANTS_BOOTSTRAP_CLONE="1")
+    assert "2.13.0" == result.stdout.strip()
+    assert "Upgrading a clone" not in result.stderr
+
+
+def test_optimized_venv_clone(build_root: Path, setup_cache: Path, python: str) -> None:
+    source = create_fake_pants_venv(
+        setup_cache=setup_cache, pants_version="2.11.0", python=python, manifest=True
+    )
+    stub_pip(source)
+    (site_packages,) = source.glob("lib/python*/site-packages")
+    (site_packages / "a.pth").write_text("import sys; sys.optimized = True\n")
+    (site_packages / "lib").mkdir()
+    (site_packages / "lib" / "__init__.py").touch()
+    (site_packages / "lib" / "tests").mkdir()
+    (site_packages / "setuptools").mkdir()
+    (site_packages / "setuptools" / "cli.exe").touch()
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+
+    result = run_pants(
+        build_root,
+        "--version",
+        env={"PANTS_BOOTSTRAP_CLONE": "1", "PANTS_BOOTSTRAP_OPTIMIZE": "1", "PYTHON": python},
+    )
+    assert "2.12.0" == result.stdout.strip()
+    assert "Optimized the virtual environment for startup: " in result.stderr
+
+    venv = source.with_name(source.name.replace("2.11.0", "2.12.0"))
+    (site_packages,) = venv.glob("lib/python*/site-packages")
+    assert list((site_packages / "lib" / "__pycache__").glob("__init__.*.pyc"))
+    # A clone is only compiled, since it shares files with its source.
+    assert (site_packages / "setuptools" / "cli.exe").is_file()
+    assert (site_packages / "a.pth").is_file()
+    assert (site_packages / "lib" / "tests").is_dir()
+    assert not (venv / "bootstrap-pruned").exists()
+
+
+def test_bootstrap_prewarm(build_root: Path, setup_cache: Path, python: str) -> None:
+    venvs = {
+        version: create_fake_pants_venv(
+            setup_cache=setup_cache, pants_version=version, python=python
+        )
+        for version in ("2.16.0", "2.17.0")
+    }
+    create_pants_config(parent_folder=build_root, pants_version="2.17.0")
+
+    result = subprocess.run(
+        [
+            "./pants",
+            "bootstrap-prewarm",
+            "--versions",
+            "2.16.0,2.17.0",
+            "--pythons",
+            python,
+            "--pythons",
+            "no-such-python",
+            "--jobs",
+            "2",
+        ],
+        cwd=build_root,
+        env={**os.environ, "PANTS_BOOTSTRAP_TOOLS": "6"},
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    assert result.returncode != 0
+    assert "Failed to bootstrap 2 of 4 venvs." in result.stderr
+    reports = [
+        dict(field.split("=", 1) for field in line.split()) for line in result.stdout.splitlines()
+    ]
+    assert [
+        ("ok", "2.16.0", str(venvs["2.16.0"])),
+        ("failed", "2.16.0", "-"),
+        ("ok", "2.17.0", str(venvs["2.17.0"])),
+        ("failed", "2.17.0", "-"),
+    ] == [(report["status"], report["pants_version"], report["venv"]) for report in reports]
+
+
+def test_bootstrap_prewarm_sha(build_root: Path, setup_cache: Path, python: str) -> None:
+    sha = "e4a00eb2750d00371cfe1d438c872ec3ea926369"
+    version = "2.12.0.dev0+gite4a00eb2"
+    (setup_cache / "sha-versions").mkdir(parents=True)
+    (setup_cache / "sha-versions" / sha).write_text("2.12.0.dev0\n")
+    # NB: Bootstrapping clones the 2.11.0 venv, whose pip records what it is asked to install. The
+    # prewarm builds the virtualenv PEX up front regardless; so we stand in for that too.
+    virtualenv_pex = bootstrap_dir(setup_cache) / "virtualenv-20.4.7" / "virtualenv.pex"
+    virtualenv_pex.parent.mkdir(parents=True)
+    virtualenv_pex.touch()
+    stub_pip(
+        create_fake_pants_venv(
+            setup_cache=setup_cache, pants_version="2.11.0", python=python, manifest=True
+        )
+    )
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+
+    binaries_url = "http://127.0.0.1:9"
+    env = {
+        "PANTS_BINARIES_URL": binaries_url,
+        "PANTS_BOOTSTRAP_CLONE": "1",
+        "PANTS_BOOTSTRAP_TOOLS": "6",
+        "PANTS_SHA": sha,
+        "PYTHON": python,
+    }
+    result = run_pants(build_root, "bootstrap-prewarm", "--pythons", python, env=env)
+    assert [f"pants_version={version}"] == [
+        field for field in result.stdout.split() if field.startswith("pants_version=")
+    ]
+    (venv,) = filter(Path.is_symlink, bootstrap_dir(setup_cache).glob(f"{version}_py*"))
+    find_links = (
+        f"{binaries_url}/wheels/pantsbuild.pants/{sha}/2.12.0.dev0%2Bgite4a00eb2/index.html"
+    )
+    assert f"--find-links={find_links}" in (venv / "pip.log").read_text().split()
+
+
+def test_bootstrap_status(build_root: Path, setup_cache: Path, python: str) -> None:
+    venv = create_fake_pants_venv(setup_cache=setup_cache, pants_version="2.17.0", python=python)
+    create_pants_config(parent_folder=build_root, pants_version="2.17.0")
+    env = {"PANTS_BOOTSTRAP_TOOLS": "7", "PYTHON": python}
+
+    def bootstrap_status() -> Any:
+        return json.loads(run_pants(build_root, "bootstrap-status", env=env).stdout)
+
+    status = bootstrap_status()
+    assert "2.17.0" == status["pants_version"]
+    assert python == status["python"]
+    assert f"{venv}" == status["target"]
+    assert {"present": False, "valid": False, "size_bytes": 0}.items() <= status["layers"][
+        "pex"
+    ].items()
+    assert {"present": True, "valid": True}.items() <= status["layers"]["venv"].items()
+    assert status["layers"]["venv"]["size_bytes"] > 0
+    # The venv is verified without giving it a manifest.
+    assert not (venv / "bootstrap-manifest").exists()
+
+    # The cache key reuses the resolution of a run.
+    assert "2.17.0" == run_pants(build_root, "--version", env={"PYTHON": python}).stdout.strip()
+    assert "pants_version=2.17.0" in run_pants(build_root, "bootstrap-cache-key", env=env).stdout
+
+    # Nothing is bootstrapped and a broken venv is reported rather than rebuilt.
+    (venv / "bootstrap-manifest").unlink()
+    (venv / "bin" / "python").unlink()
+    status = bootstrap_status()
+    assert {"present": True, "valid": False}.items() <= status["layers"]["venv"].items()
+    assert not (bootstrap_dir(setup_cache) / "pex-2.1.103").exists()
+
+
+def test_verified_digest_sidecar(
+    build_root: Path, setup_cache: Path, python: str, tmp_path: Path
+) -> None:
+    create_fake_pants_venv(setup_cache=setup_cache, pants_version="2.17.0", python=python)
+    create_pants_config(parent_folder=build_root, pants_version="2.17.0")
+    env = {"PANTS_BOOTSTRAP_TOOLS": "7", "PYTHON": python}
+
+    def pex_status() -> Any:
+        status = json.loads(run_pants(build_root, "bootstrap-status", env=env).stdout)
+        return status["layers"]["pex"]
+
+    pex = bootstrap_dir(setup_cache) / "pex-2.1.103" / "pex"
+    pex.parent.mkdir(parents=True)
+    pex.write_text("not the Pex PEX")
+    assert {"present": True, "valid": False}.items() <= pex_status().items()
+    # Checking the status only reads the cache.
+    sidecar = pex.with_name("pex.sha256")
+    assert not sidecar.exists()
+
+    # A recorded digest is trusted for as long as the artifact is unchanged.
+    expected_sha256 = "4d45336511484100ae4e2bab24542a8b86b12c8cb89230463593c60d08c4b8d3"
+    stat = pex.stat()
+    sidecar.write_text(f"{expected_sha256} {int(stat.st_mtime)}:{stat.st_size}\n")
+    assert pex_status()["valid"]
+
+    pex.write_text("still not the Pex PEX")
+    assert not pex_status()["valid"]
+    assert expected_sha256 == sidecar.read_text().split()[0]
+
+    # Bootstrapping, unlike checking the status, records the digests it verifies.
+    virtualenv_pex = bootstrap_dir(setup_cache) / "virtualenv-20.4.7" / "virtualenv.pex"
+    virtualenv_pex.parent.mkdir()
+    virtualenv_pex.write_text("virtualenv")
+    bundle = tmp_path / "bundle.tar.gz"
+    pex.unlink()
+    run_pants(build_root, "bootstrap-export", "--output", str(bundle), env=env)
+    other_setup_cache = tmp_path / "other_setup_cache"
+    run_pants(
+        build_root,
+        "bootstrap-import",
+        str(bundle),
+        env={**env, "PANTS_SETUP_CACHE": str(other_setup_cache)},
+    )
+    imported = bootstrap_dir(other_setup_cache) / "virtualenv-20.4.7" / "virtualenv.pex"
+    digest, signature = imported.with_name("virtualenv.pex.sha256").read_text().split()
+    assert hashlib.sha256(b"virtualenv").hexdigest() == digest
+    stat = imported.stat()
+    assert f"{int(stat.st_mtime)}:{stat.st_size}" == signature
@@ -156,3 +156,97 @@ def test_scrub_pex_vars(build_root: Path) -> None:
         yellow("Scrubbing PEX_FOO PEX_BAR ") in stderr_lines
         or yellow("Scrubbing PEX_BAR PEX_FOO ") in stderr_lines
     )
+
+
+def test_concurrent_runs_bootstrap_once(build_root: Path) -> None:
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+    runs = [
+        subprocess.Popen(
+            ["./pants", "--version"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            encoding="utf-8",
+            cwd=str(build_root),
+        )
+        for _ in range(4)
+    ]
+    results = [run.communicate() for run in runs]
+    assert all(run.returncode == 0 for run in runs)
+    assert all("2.12.0" == stdout.strip() for stdout, _ in results)
+    assert 1 == sum("Bootstrapping Pants using" in stderr for _, stderr in results)
+
+    # Only the staging dir of the venv that was built should remain.
+    bootstrap_dirs = list(Path(os.environ["PANTS_SETUP_CACHE"]).glob("bootstrap-*"))
+    assert 1 == len(bootstrap_dirs)
+    assert 1 == len(list(bootstrap_dirs[0].glob("pants.*")))
+
+
+def test_pipelined_bootstrap(build_root: Path) -> None:
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+    result = subprocess.run(
+        ["./pants", "--version"],
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        cwd=str(build_root),
+        env={**os.environ, "PANTS_BOOTSTRAP_PIPELINE": "1"},
+    )
+    assert "2.12.0" == result.stdout.strip()
+    assert "installing from the index instead" not in result.stderr
+
+    # The prefetched wheels should not be left behind in the venv's staging dir.
+    staging_dirs = list(Path(os.environ["PANTS_SETUP_CACHE"]).glob("bootstrap-*/pants.*"))
+    assert 1 == len(staging_dirs)
+    assert ["install"] == [path.name for path in staging_dirs[0].iterdir()]
+
+
+def test_pex_engine(build_root: Path) -> None:
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+    result = subprocess.run(
+        ["./pants", "--version"],
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        cwd=str(build_root),
+        env={**os.environ, "PANTS_BOOTSTRAP_ENGINE": "pex"},
+    )
+    assert "2.12.0" == result.stdout.strip()
+
+    # The pex engine never needs the virtualenv PEX.
+    bootstrap_dirs = list(Path(os.environ["PANTS_SETUP_CACHE"]).glob("bootstrap-*"))
+    assert 1 == len(bootstrap_dirs)
+    assert not list(bootstrap_dirs[0].glob("virtualenv-*"))
+
+
+def test_bootstrap_lock(build_root: Path, tmp_path: Path) -> None:
+    create_pants_config(parent_folder=build_root, pants_version="2.12.0")
+    locks = tmp_path / "locks"
+    env = {**os.environ, "PANTS_BOOTSTRAP_LOCKS": str(locks)}
+    lock = Path(
+        subprocess.run(
+            ["./pants", "bootstrap-lock"],
+            check=True,
+            stdout=subprocess.PIPE,
+            encoding="utf-8",
+            cwd=str(build_root),
+            env={**env, "PANTS_BOOTSTRAP_TOOLS": "5"},
+        ).stdout.strip()
+    )
+    assert lock.parent == locks
+    pins = [line for line in lock.read_text().splitlines() if not line.startswith("#")]
+    assert any(pin.startswith("pantsbuild.pants==2.12.0 --hash=sha256:") for pin in pins)
+    assert all(" --hash=sha256:" in pin for pin in pins)
+
+    result = subprocess.run(
+        ["./pants", "--version"],
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        cwd=str(build_root),
+        env=env,
+    )
+    assert "2.12.0" == result.stdout.strip()
+    assert f"Installing the requirements locked in {lock}" in result.stderr
@@ -3,9 +3,13 @@
 
 """Test the pantsup script."""
 
+import hashlib
+import os
 import subprocess
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterable, List, Optional
+
+from helpers import serve
 
 
 def script_location() -> Path:
@@ -13,6 +17,10 @@ def script_location() -> Path:
 
 
 def _run(home: Path, args: List[str], check: bool = True) -> subprocess.CompletedProcess:
+    # N.B.: The `hermetic_urls` fixture may point us at a mirror of the scie-pants releases.
+    mirror = os.environ.get("SCIE_PANTS_MIRROR")
+    if mirror and "--mirror" not in args:
+        args = [*args, "--mirror", mirror]
     return subprocess.run(
         ["/bin/bash", script_location(), *args],
         env={"HOME": str(home)},
@@ -63,3 +71,73 @@ def test_installs_to_specific_dir_when_bin_dir_arg(tmp_path: Path) -> None:
 def test_installs_with_base_name_when_base_name_arg(tmp_path: Path) -> None:
     _run(home=tmp_path, args=["--base-name", "other-name"])
     _check_launcher_runs(tmp_path / ".local" / "bin" / "other-name")
+
+
+def create_mirror(mirror: Path, versions: Iterable[str], os_arches: Iterable[str]) -> None:
+    """Lay out fake scie-pants releases, which just report their version, as GitHub does."""
+    for version in versions:
+        release = mirror / "download" / f"v{version}"
+        release.mkdir(parents=True)
+        for os_arch in os_arches:
+            name = f"scie-pants-{os_arch}"
+            content = f"#!/bin/sh\necho {version} {os_arch}\n".encode()
+            (release / name).write_bytes(content)
+            (release / f"{name}.sha256").write_text(
+                f"{hashlib.sha256(content).hexdigest()}  {name}\n"
+            )
+
+
+def test_reinstall_only_fetches_fingerprint(tmp_path: Path) -> None:
+    mirror = tmp_path / "mirror"
+    create_mirror(mirror, ["0.10.0"], ["linux-x86_64"])
+    destination = tmp_path / ".local" / "bin" / "pants"
+    args = ["--version", "0.10.0", "--os", "linux", "--arch", "x86_64"]
+    requests: List[str] = []
+    with serve(mirror, requests=requests) as url:
+        _run(home=tmp_path, args=[*args, "--mirror", url])
+
+        requests.clear()
+        proc = _run(home=tmp_path, args=[*args, "--mirror", url])
+        assert b"already matches the fingerprint" in proc.stderr
+        assert ["/download/v0.10.0/scie-pants-linux-x86_64.sha256"] == requests
+        _check_launcher_runs(destination, expected_version="0.10.0 linux-x86_64")
+
+        destination.unlink()
+        requests.clear()
+        proc = _run(home=tmp_path, args=[*args, "--mirror", url])
+        assert b"downloaded previously" in proc.stderr
+        assert ["/download/v0.10.0/scie-pants-linux-x86_64.sha256"] == requests
+        _check_launcher_runs(destination, expected_version="0.10.0 linux-x86_64")
+
+
+def test_installs_multiple_targets_from_mirror(tmp_path: Path) -> None:
+    mirror = tmp_path / "mirror"
+    create_mirror(mirror, ["0.1.0", "0.2.0"], ["linux-x86_64", "linux-aarch64"])
+
+    output = tmp_path / "launchers"
+    args = ["--os", "linux", "--arch", "x86_64", "--arch", "aarch64"]
+    with serve(mirror) as url:
+        _run(
+            home=tmp_path,
+            args=[
+                *args,
+                "--version",
+                "0.1.0",
+                "--version",
+                "0.2.0",
+                "--mirror",
+                url,
+                "--output",
+                f"{output}/{{version}}/pants-{{os}}-{{arch}}",
+            ],
+        )
+        proc = _run(home=tmp_path, args=[*args, "--mirror", url], check=False)
+    assert proc.returncode != 0
+    assert b"More than one target would be installed to" in proc.stderr
+
+    for version in ("0.1.0", "0.2.0"):
+        for arch in ("x86_64", "aarch64"):
+            assert (
+                f"#!/bin/sh\necho {version} linux-{arch}\n"
+                == (output / version / f"pants-linux-{arch}").read_text()
+            )
@@ -0,0 +1,93 @@
+# Copyright 2023 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+"""Test the test helpers that stand in for the network."""
+
+import os
+import subprocess
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import List
+
+import pytest
+from helpers import (
+    SeedCache,
+    bootstrap_dir,
+    create_fake_pants_venv,
+    create_pants_config,
+    serve_recordings,
+)
+
+
+def test_serve_recordings(tmp_path: Path) -> None:
+    index = tmp_path / "pypi.org" / "simple" / "six" / "__index__"
+    index.parent.mkdir(parents=True)
+    index.write_text('<a href="https://files.pythonhosted.org/six.whl#sha256=abc">six.whl</a>')
+    index.with_name("__index__.content-type").write_text("text/html")
+    wheel = tmp_path / "files.pythonhosted.org" / "six.whl"
+    wheel.parent.mkdir(parents=True)
+    wheel.write_bytes(b"https://not.rewritten")
+    wheel.with_name("six.whl.content-type").write_text("application/octet-stream")
+
+    missing: List[str] = []
+    with serve_recordings(tmp_path, missing=missing) as url:
+        with urllib.request.urlopen(f"{url}/pypi.org/simple/six/") as response:
+            assert "text/html" == response.headers["Content-Type"]
+            assert (
+                f'<a href="{url}/files.pythonhosted.org/six.whl#sha256=abc">six.whl</a>'
+                == response.read().decode()
+            )
+        with urllib.request.urlopen(f"{url}/files.pythonhosted.org/six.whl") as response:
+            assert b"https://not.rewritten" == response.read()
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            urllib.request.urlopen(f"{url}/files.pythonhosted.org/missing.whl")
+        assert 404 == excinfo.value.code
+    assert ["/files.pythonhosted.org/missing.whl"] == missing
+
+
+def test_seed_cache_clone(build_root: Path, python: str, tmp_path: Path) -> None:
+    seed_cache = SeedCache(tmp_path / "seed")
+    seeded = create_fake_pants_venv(
+        setup_cache=seed_cache.setup_cache, pants_version="2.17.0", python=python
+    )
+    pex = bootstrap_dir(seed_cache.setup_cache) / "pex-2.1.103" / "pex"
+    pex.parent.mkdir()
+    pex.write_text("pex")
+    sidecar = pex.with_name("pex.sha256")
+    sidecar.write_text("digest")
+    (site_packages,) = seeded.glob("lib/python*/site-packages")
+    native_client = site_packages / "pants" / "bin" / "native_client"
+    native_client.parent.mkdir(parents=True)
+    native_client.touch(mode=0o644)
+    env = {**os.environ, "PYTHON": python}
+    seed_cache.seed("2.17.0", pants_version="2.17.0", env=env)
+    assert (seeded.parent / f"{seeded.name}.last-used").exists()
+    assert os.access(native_client, os.X_OK)
+    seeded_native_client = native_client.stat()
+
+    setup_cache = Path(os.environ["PANTS_SETUP_CACHE"])
+    seed_cache.clone_into(setup_cache)
+    create_pants_config(parent_folder=build_root, pants_version="2.17.0")
+    result = subprocess.run(
+        ["./pants", "--version"],
+        cwd=build_root,
+        env=env,
+        check=True,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    assert "2.17.0" == result.stdout.strip()
+
+    # The clone runs the seed's venv, but keeps its own record of using it.
+    bootstrap = bootstrap_dir(setup_cache)
+    venv = bootstrap / seeded.name
+    assert seeded.resolve() == venv.resolve()
+    assert (venv.parent / f"{venv.name}.last-used").exists()
+    assert not list(bootstrap.glob("pants.*"))
+    assert seeded_native_client.st_ctime_ns == native_client.stat().st_ctime_ns
+
+    # The PEX is shared, but files that get rewritten in place are not.
+    assert pex.samefile(bootstrap / "pex-2.1.103" / "pex")
+    (bootstrap / "pex-2.1.103" / "pex.sha256").write_text("rewritten")
+    assert "digest" == sidecar.read_text()
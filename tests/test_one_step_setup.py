@@ -3,9 +3,14 @@
 
 """Test that the one-step setup flow described in Pants docs works as expected."""
 
+import json
 import os
+import shutil
 import subprocess
 from pathlib import Path
+from typing import List
+
+from helpers import create_fake_pants_venv, serve
 
 
 def test_runs_on_clean_directory(tmp_path: Path) -> None:
@@ -67,3 +72,52 @@ def test_fails_if_pants_toml_present(tmp_path: Path) -> None:
     )
 
     assert proc.returncode == 1
+
+
+def test_uses_mirrors_and_caches_latest_version(tmp_path: Path) -> None:
+    python = next(filter(None, map(shutil.which, ("python3.9", "python3.8", "python3.7"))))
+    setup_cache = tmp_path / "cache"
+    create_fake_pants_venv(setup_cache=setup_cache, pants_version="2.17.0", python=python)
+
+    mirror = tmp_path / "mirror"
+    (mirror / "pypi" / "pantsbuild.pants").mkdir(parents=True)
+    (mirror / "pypi" / "pantsbuild.pants" / "json").write_text(
+        json.dumps(
+            {
+                "info": {"name": "pantsbuild.pants", "version": "2.17.0"},
+                "releases": {"2.18.0rc0": [{"python_version": "cp39", "version": "2.18.0"}]},
+            }
+        )
+    )
+    shutil.copy("pants", mirror / "pants")
+
+    def one_step_setup(pypi_url: str, project: Path) -> subprocess.CompletedProcess:
+        project.mkdir()
+        return subprocess.run(
+            ["/bin/bash", os.path.join(os.getcwd(), "one_step_setup.sh")],
+            cwd=project,
+            env={
+                **os.environ,
+                "PANTS_SETUP_CACHE": str(setup_cache),
+                "PYPI_URL": pypi_url,
+                "PANTS_SCRIPT_URL": f"{url}/pants",
+                "PYTHON": python,
+            },
+            capture_output=True,
+        )
+
+    requests: List[str] = []
+    with serve(mirror, requests=requests) as url:
+        assert 0 == one_step_setup(url, tmp_path / "project").returncode
+        assert '"2.17.0"' in (tmp_path / "project" / "pants.toml").read_text()
+
+        # The latest version is now cached for this PyPI URL; so it is not looked up again.
+        assert 0 == one_step_setup(url, tmp_path / "project2").returncode
+        assert '"2.17.0"' in (tmp_path / "project2" / "pants.toml").read_text()
+        assert 1 == requests.count("/pypi/pantsbuild.pants/json")
+
+        # But the cached version is not used for a different PyPI URL.
+        proc = one_step_setup("http://127.0.0.1:9", tmp_path / "project3")
+        assert 1 == proc.returncode
+        assert not (tmp_path / "project3" / "pants").exists()
+        assert not (tmp_path / "project3" / "pants.toml").exists()
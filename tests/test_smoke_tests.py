@@ -3,6 +3,7 @@
 
 """Test that `./pants` works correctly with some basic sanity checks."""
 import dataclasses
+import functools
 import os
 import shlex
 import subprocess
@@ -12,15 +13,16 @@ import textwrap
 from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Mapping, Optional
 
 import pytest
-from helpers import create_pants_config
+from helpers import SeedCache, create_pants_config
 
 
 @dataclass(frozen=True)
 class PythonVersion:
     @classmethod
+    @functools.lru_cache(maxsize=None)
     def extract(cls, python_exe_path: Path) -> Optional["PythonVersion"]:
         result = subprocess.run(
             args=[
@@ -53,11 +55,15 @@ class PythonVersion:
 @dataclass(frozen=True)
 class SmokeTester:
     build_root: Path
+    seed_cache: SeedCache
 
     @dataclass(frozen=True)
     class PythonSetup:
         extra_env: Mapping[str, str] = dataclasses.field(default_factory=lambda: {})
         bad_python_exes: Iterable[Path] = ()
+        # What `extra_env` has `./pants` pick its interpreter from; unlike `extra_env` itself, which
+        # names a temporary directory, this is the same for every setup that picks the same way.
+        interpreter_key: Hashable = ()
 
         @contextmanager
         def deactivate_bad_aliases(self) -> Iterator[None]:
@@ -110,6 +116,7 @@ class SmokeTester:
             yield self.PythonSetup()
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def which(*exe_names: str, fallible: bool = False, all: bool = False) -> Mapping[str, Path]:
         which = "which -a" if all else "which"
         return {
@@ -187,7 +194,13 @@ class SmokeTester:
                     bad_python_exes.append(bad_python_exe)
 
             yield self.PythonSetup(
-                extra_env={"PATH": temp_dir}, bad_python_exes=frozenset(bad_python_exes)
+                extra_env={"PATH": temp_dir},
+                bad_python_exes=frozenset(bad_python_exes),
+                interpreter_key=(
+                    alias,
+                    str(python_exe_path.resolve()),
+                    tuple(sorted((bad_aliases or {}).items())),
+                ),
             )
 
     def smoke_test(
@@ -251,6 +264,12 @@ class SmokeTester:
                     run_command(binary_command, **kwargs)
 
             env = {**env, **python_setup.extra_env}
+            self.seed_cache.seed(
+                (pants_version, python_setup.interpreter_key, sha, override_version),
+                pants_version=pants_version,
+                env=env,
+            )
+            self.seed_cache.clone_into(Path(env["PANTS_SETUP_CACHE"]))
             run_command(version_command, env=env)
             run_command(list_command, env=env)
             run_command(bootstrap_cache_key_command, env={**env, "PANTS_BOOTSTRAP_TOOLS": "1"})
@@ -262,12 +281,6 @@ class SmokeTester:
                 run_command(bootstrap_cache_key_command, env={**env, "PANTS_BOOTSTRAP_TOOLS": "1"})
                 run_binary_command(env=env_with_pantsd)
 
-    def smoke_test_for_all_python_versions(
-        self, *python_versions: PythonVersion, pants_version: str
-    ) -> None:
-        for python_version in python_versions:
-            self.smoke_test(pants_version=pants_version, python_version=python_version)
-
 
 # We don't require Python 3.6 since it won't be patched to work on macOS 11:
 #   https://bugs.python.org/issue43470
@@ -276,19 +289,25 @@ PY37 = PythonVersion(3, 7)
 PY38 = PythonVersion(3, 8)
 
 
+def python_version_id(python_version: Optional[PythonVersion]) -> str:
+    return (
+        "default" if python_version is None else f"py{python_version.major}{python_version.minor}"
+    )
+
+
 @pytest.fixture
-def checker(build_root: Path) -> SmokeTester:
-    return SmokeTester(build_root=build_root)
+def checker(build_root: Path, seed_cache: SeedCache) -> SmokeTester:
+    return SmokeTester(build_root=build_root, seed_cache=seed_cache)
 
 
-def test_pants_1(checker: SmokeTester) -> None:
-    checker.smoke_test(python_version=None, pants_version="1.30.4")
-    checker.smoke_test_for_all_python_versions(PY36, PY37, PY38, pants_version="1.30.4")
+@pytest.mark.parametrize("python_version", [None, PY36, PY37, PY38], ids=python_version_id)
+def test_pants_1(checker: SmokeTester, python_version: Optional[PythonVersion]) -> None:
+    checker.smoke_test(python_version=python_version, pants_version="1.30.4")
 
 
-def test_pants_2(checker: SmokeTester) -> None:
-    checker.smoke_test(python_version=None, pants_version="2.3.0")
-    checker.smoke_test_for_all_python_versions(PY37, PY38, pants_version="2.3.0")
+@pytest.mark.parametrize("python_version", [None, PY37, PY38], ids=python_version_id)
+def test_pants_2(checker: SmokeTester, python_version: Optional[PythonVersion]) -> None:
+    checker.smoke_test(python_version=python_version, pants_version="2.3.0")
 
 
 def test_pants_at_sha(checker: SmokeTester) -> None: